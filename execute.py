@@ -6,18 +6,28 @@ Assign plants to customers considering a limit on the number of plants to use.
 Some plants must be used and some cannot be used.
 The solution is driven by weighted distance or transportation cost.
 """
+import itertools
 import sys
 
+import numpy as np
 import pandas as pd
 import gurobipy as gp
 from gurobipy import GRB
 
 from plots import plot_network
-from utils import calculate_distance_haversine, prepare_location_dataframe
+from utils import (calculate_distance_haversine_numba, calculate_distance_haversine_vector,
+                   prepare_location_dataframe, read_excel_cached)
+
+# One environment shared by every model built in this process, so repeated
+# runs (parameter sweeps, notebook re-runs) pay the license check and logger
+# setup only once
+_ENV = gp.Env(empty=True)
+_ENV.setParam('OutputFlag', 1)  # enables or disables solver output
+_ENV.start()
 
 
 def prep_data(file_name):
-    input_df_dict = pd.read_excel(file_name, sheet_name=None)
+    input_df_dict = read_excel_cached(file_name)
     cust_df = input_df_dict['Customers']
     plant_df = input_df_dict['Plants']
     cust_df.rename(columns={'ID': 'Customer ID', 'Name': 'Customer Name'}, inplace=True)
@@ -36,19 +46,19 @@ def run_network_optimization(plant_df, cust_df, auto_open_map=True):
     """This is mainly a P-median problem."""
     # region Set Up Data
     dist = get_distance(plant_df, cust_df)
-    dist['Cost'] = dist['Distance'].apply(lambda x: max(cost_per_mile * x, min_cost))
+    dist['Cost'] = np.maximum(cost_per_mile * dist['Distance'].to_numpy(), min_cost)
     dmd = cust_df.set_index(['Customer ID'])
 
     # Sets
     plnt = plant_df['Plant ID'].unique()  # I
     cust = cust_df['Customer ID'].unique()  # J
-    ij_set = set((i, j) for i in plnt for j in cust)  # Pair of I,J. Created to avoid repetition in the code
+    ij_list = list(itertools.product(plnt, cust))  # Pairs of I,J. Created to avoid repetition in the code
     must_use_plants = plant_df.loc[plant_df['Must Use'], 'Plant ID'].to_list()  # Forced locations or FI set
     unavailable_plants = plant_df.loc[~plant_df['Can Use'], 'Plant ID'].to_list()  # Unavailable locations or UI set
     # endregion
 
     # region Optimization Model
-    mdl = gp.Model('net_optimization')
+    mdl = gp.Model('net_optimization', env=_ENV)
 
     # Variables
     x = mdl.addVars(plnt, vtype=GRB.BINARY, name='x')
@@ -65,7 +75,10 @@ def run_network_optimization(plant_df, cust_df, auto_open_map=True):
 
     # 3. Cant serve a customer from a plant if it's not used
     # y_{ij} <= x_{i}    for all i, j
-    mdl.addConstrs((y[i, j] <= x[i] for (i, j) in ij_set), 'rel_x_y')
+    # Iterate the y tupledict directly rather than re-walking ij_list. The
+    # constraints stay disaggregated per pair to keep the LP relaxation tight;
+    # the aggregated sum_{j} y_{ij} <= |J|*x_{i} form builds faster but solves slower.
+    mdl.addConstrs((y[i, j] <= x[i] for (i, j) in y), 'rel_x_y')
 
     # Extra
     # 4. Plants that we must use
@@ -78,16 +91,28 @@ def run_network_optimization(plant_df, cust_df, auto_open_map=True):
 
     # KPI
     # sum_{ij} q_{j}*d_{ij}*y_{ij}
-    total_weighted_dist = gp.quicksum(dist.loc[i, j]['Distance'] * dmd.loc[j]['Demand'] * y[i, j]
-                                      for (i, j) in ij_set)
+    # Build the expression from parallel coefficient/variable lists. A single
+    # bulk addTerms call replaces two pandas label lookups and a quicksum
+    # dispatch per pair, which dominate the model-build time on large N x M.
+    dist_matrix = dist['Distance'].to_numpy().reshape(len(plnt), len(cust))
+    dmd_arr = dmd.loc[cust, 'Demand'].to_numpy()
+    total_weighted_dist = gp.LinExpr()
+    total_weighted_dist.addTerms((dist_matrix * dmd_arr[None, :]).ravel().tolist(),
+                                 [y[i, j] for (i, j) in ij_list])
     # Objective function
     # Case 1: minimize total weighted distance
     objective = total_weighted_dist
     # # Case 2: minimize total transportation cost
     # # sum_{ij} c_{ij}*y_{ij}
-    # objective = gp.quicksum((dist.loc[i, j]['Cost'] * y[i, j]) for (i, j) in ij_set)
+    # objective = gp.LinExpr()
+    # objective.addTerms(dist['Cost'].to_list(), [y[i, j] for (i, j) in ij_list])
     mdl.setObjective(objective, GRB.MINIMIZE)
-    mdl.setParam(GRB.Param.OutputFlag, 1)  # enables or disables solver output
+    # Solver tuning for the P-median shape: aggressive presolve, barrier for
+    # the root relaxation, and emphasis on finding good solutions early
+    mdl.setParam(GRB.Param.Presolve, 2)
+    mdl.setParam(GRB.Param.Method, 2)
+    mdl.setParam(GRB.Param.MIPFocus, 1)
+    set_warm_start(dist_matrix, dmd_arr, plnt, cust, must_use_plants, unavailable_plants, x, y)
     # mdl.write(mdl.ModelName + '.lp')  # writing the optimization model to a '.lp' file
     mdl.optimize()
     status = mdl.status
@@ -101,57 +126,118 @@ def run_network_optimization(plant_df, cust_df, auto_open_map=True):
         sys.exit(1)
     # endregion
 
-    lanes = generate_outputs(plant_df, cust_df, dist, dmd, total_weighted_dist, x, y)
+    lanes = generate_outputs(mdl, plant_df, dist, dmd, total_weighted_dist, x, y)
     # Plot output map
     plot_network(lanes, auto_open_map=auto_open_map, title='Solution Map',
                  open_map_in_cell=open_map_in_cell)
 
 
+def set_warm_start(dist_matrix, dmd_arr, plnt, cust, must_use_plants, unavailable_plants, x, y):
+    """Give the solver a greedy feasible solution as a starting point.
+
+    Open the must-use plants first, then keep adding the plant that most
+    reduces the total demand-weighted distance until max_plants are open,
+    and assign every customer to its nearest open plant. A feasible
+    incumbent at the root lets Gurobi prune from the first node.
+    """
+    must_use = set(must_use_plants)
+    unavailable = set(unavailable_plants)
+    open_idx = [i for i, p in enumerate(plnt) if p in must_use]
+    candidates = [i for i, p in enumerate(plnt) if p not in must_use and p not in unavailable]
+    weighted = dist_matrix * dmd_arr[None, :]
+    while len(open_idx) < max_plants and candidates:
+        best = min(candidates, key=lambda i: weighted[open_idx + [i]].min(axis=0).sum())
+        open_idx.append(best)
+        candidates.remove(best)
+    if not open_idx:
+        return
+    nearest = np.asarray(open_idx)[np.argmin(dist_matrix[open_idx], axis=0)]
+    open_set = set(open_idx)
+    for i, p in enumerate(plnt):
+        x[p].Start = 1 if i in open_set else 0
+    for j, c in enumerate(cust):
+        y[plnt[nearest[j]], c].Start = 1
+
+
 def get_distance(orig_df, dest_df):
-    df = orig_df.merge(dest_df, how='cross').set_index(['Plant ID', 'Customer ID'])
-    df['Distance'] = df.apply(lambda r: calculate_distance_haversine(
-        r['Latitude_x'], r['Longitude_x'], r['Latitude_y'], r['Longitude_y']), axis=1)
+    # Compute all origin-destination distances at once on the (N, M) broadcast
+    # arrays. There is no need for a cross merge of the two dataframes: the
+    # raveled matrix paired with repeat/tile of the IDs gives the same
+    # row-major (origin, destination) order without the N x M intermediate join.
+    lat1 = orig_df['Latitude'].to_numpy()
+    lon1 = orig_df['Longitude'].to_numpy()
+    lat2 = dest_df['Latitude'].to_numpy()
+    lon2 = dest_df['Longitude'].to_numpy()
+    if calculate_distance_haversine_numba is not None:
+        # The JIT-compiled kernel fuses the whole computation into one pass
+        # with no intermediate N x M temporaries
+        distance = calculate_distance_haversine_numba(lat1, lon1, lat2, lon2)
+    else:
+        distance = calculate_distance_haversine_vector(lat1[:, None], lon1[:, None],
+                                                       lat2[None, :], lon2[None, :])
+    plnt_ids = orig_df['Plant ID'].to_numpy()
+    cust_ids = dest_df['Customer ID'].to_numpy()
+    df = pd.DataFrame({'Plant ID': np.repeat(plnt_ids, len(cust_ids)),
+                       'Customer ID': np.tile(cust_ids, len(plnt_ids)),
+                       'Distance': distance.ravel()}).set_index(['Plant ID', 'Customer ID'])
     return df
 
 
-def generate_outputs(plant_df, cust_df, dist, dmd, total_weighted_dist, x, y):
+def generate_outputs(mdl, plant_df, dist, dmd, total_weighted_dist, x, y):
     # region Post Process
     print('=' * 40)
-    assigned_list = [k for k, v in y.items() if v.x > 0.5]
+    # Pull all solution values in one call into the solver. Reading v.x per
+    # variable is a separate round-trip into the Gurobi C API for each one.
+    y_sol = mdl.getAttr('X', y)
+    x_sol = mdl.getAttr('X', x)
+    assigned_list = [k for k, v in y_sol.items() if v > 0.5]
     assigned_df = pd.DataFrame(assigned_list, columns=['Plant ID', 'Customer ID'])
-    _opt_plants = [plant_df.loc[plant_df['Plant ID'] == k, 'City'].iloc[0]
-                   for k, v in x.items() if v.x > 0.5]
+    # Index the plants once and look up all selected plants in one go instead
+    # of scanning plant_df per selected plant
+    plant_info = plant_df.set_index('Plant ID')
+    _opt_plants = plant_info['City'].loc[[k for k, v in x_sol.items() if v > 0.5]].to_list()
     print(f'Selected plants are in: {", ".join(str(_) for _ in _opt_plants)}')
-    adf = pd.merge(assigned_df, dmd[['Demand']], how='inner',
-                   left_on='Customer ID', right_index=True)
-    adf = pd.merge(adf.set_index(['Plant ID', 'Customer ID']), dist[['Distance']],
-                   how='inner', left_index=True, right_index=True).reset_index()
-    adf['Within400'] = [True if x <= 400 else False for x in adf['Distance']]
-    adf['Within800'] = [True if x <= 800 else False for x in adf['Distance']]
-    adf['Within1200'] = [True if x <= 1200 else False for x in adf['Distance']]
-    total_dmd = adf['Demand'].sum()
+    # Gather the attributes of the assigned pairs with index-aligned lookups
+    # (dmd is cust_df indexed by Customer ID) rather than a chain of hash joins
+    # that each copy every column of the growing left side
+    plnt_ids = assigned_df['Plant ID'].to_numpy()
+    cust_ids = assigned_df['Customer ID'].to_numpy()
+    adf = assigned_df.copy()
+    adf['Demand'] = dmd['Demand'].loc[cust_ids].to_numpy()
+    adf['Distance'] = dist['Distance'].loc[pd.MultiIndex.from_arrays([plnt_ids, cust_ids])].to_numpy()
+    # One vectorized comparison per threshold instead of a Python loop per row
+    distance_vals = adf['Distance'].to_numpy()
+    demand_vals = adf['Demand'].to_numpy()
+    within400 = distance_vals <= 400
+    within800 = distance_vals <= 800
+    within1200 = distance_vals <= 1200
+    adf['Within400'] = within400
+    adf['Within800'] = within800
+    adf['Within1200'] = within1200
+    total_dmd = demand_vals.sum()
     weighted_avg_dist = total_weighted_dist.getValue() / total_dmd
     print(f'Weighted Average Distance: {weighted_avg_dist:,.1f}')
-    pct_dmd_within400 = adf.loc[adf['Within400'], 'Demand'].sum() / total_dmd
-    pct_dmd_within800 = adf.loc[adf['Within800'], 'Demand'].sum() / total_dmd
-    pct_dmd_within1200 = adf.loc[adf['Within1200'], 'Demand'].sum() / total_dmd
+    pct_dmd_within400 = demand_vals[within400].sum() / total_dmd
+    pct_dmd_within800 = demand_vals[within800].sum() / total_dmd
+    pct_dmd_within1200 = demand_vals[within1200].sum() / total_dmd
     print(f'Total demand: {total_dmd:,.0f}')
     print(f'Percentages of demand within 400 miles of a plant: {pct_dmd_within400 * 100:,.2f}%')
     print(f'Percentages of demand within 800 miles of a plant: {pct_dmd_within800 * 100:,.2f}%')
     print(f'Percentages of demand within 1200 miles of a plant: {pct_dmd_within1200 * 100:,.2f}%')
     print('=' * 40)
-    # Create the set of lanes
-    lanes = pd.merge(assigned_df, dmd[['Demand']], how='inner',
-                     left_on='Customer ID', right_index=True)
-    lanes['Lane'] = lanes['Plant ID'].map(str) + '-' + lanes['Customer ID'].map(str)
-    lanes = lanes[['Plant ID', 'Customer ID', 'Demand', 'Lane']].merge(
-        cust_df[['Customer ID', 'Customer Name', 'Latitude', 'Longitude']], on='Customer ID')
-    lanes.rename(columns={'Latitude': 'Dest Lat', 'Longitude': 'Dest Lon'}, inplace=True)
-    lanes = lanes.merge(plant_df[['Plant ID', 'Plant Name', 'Latitude', 'Longitude']], on='Plant ID')
-    lanes.rename(columns={'Latitude': 'Origin Lat', 'Longitude': 'Origin Lon',
-                          'Plant Name': 'Origin', 'Customer Name': 'Destination'}, inplace=True)
-    lanes = lanes[['Lane', 'Origin', 'Destination', 'Demand', 'Plant ID',
-                   'Origin Lat', 'Origin Lon', 'Customer ID', 'Dest Lat', 'Dest Lon']].drop_duplicates()
+    # Create the set of lanes in one allocation. The assigned pairs are unique
+    # (each customer is served by one plant), so no drop_duplicates pass is needed.
+    lanes = pd.DataFrame({
+        'Lane': np.char.add(np.char.add(plnt_ids.astype(str), '-'), cust_ids.astype(str)),
+        'Origin': plant_info['Plant Name'].loc[plnt_ids].to_numpy(),
+        'Destination': dmd['Customer Name'].loc[cust_ids].to_numpy(),
+        'Demand': adf['Demand'].to_numpy(),
+        'Plant ID': plnt_ids,
+        'Origin Lat': plant_info['Latitude'].loc[plnt_ids].to_numpy(),
+        'Origin Lon': plant_info['Longitude'].loc[plnt_ids].to_numpy(),
+        'Customer ID': cust_ids,
+        'Dest Lat': dmd['Latitude'].loc[cust_ids].to_numpy(),
+        'Dest Lon': dmd['Longitude'].loc[cust_ids].to_numpy()})
     # endregion
     return lanes
 
@@ -2,15 +2,16 @@
 Obtained and modified the code of:
 https://github.com/ekhoda/plotly_hub_and_spoke
 """
+import numpy as np
 import plotly.graph_objects as go
 
 
 def plot_network(data, add_path=True, auto_open_map=False, title='', open_map_in_cell=False):
     """Plot a hub-and-spoke network."""
     # Prepare the data
-    df_dict = create_location_dataframe(data)
-    locations = set_locations_map(df_dict)
-    lat_range, lon_range = get_lat_lon_range(df_dict)
+    location_dict = create_location_data(data)
+    locations = set_locations_map(location_dict)
+    lat_range, lon_range = get_lat_lon_range(location_dict)
     scope = get_scope(lat_range, lon_range)
 
     fig = go.Figure()
@@ -50,74 +51,76 @@ def plot_network(data, add_path=True, auto_open_map=False, title='', open_map_in
     fig.write_html(file=f'{title}.html', auto_open=auto_open_map)
 
 
-def create_location_dataframe(data):
-    """Return a dataframe with the proper attributes needed for the plot."""
-    origin_df = data[['Origin', 'Origin Lat', 'Origin Lon']].drop_duplicates()
-    origin_df['text'] = origin_df['Origin']
-    origin_df['size'] = 20
-    origin_df['color'] = 'blue'
-    origin_df['shape'] = 'triangle-up'
-    origin_df['name'] = origin_df['Origin']
-    origin_df.rename(columns={'Origin Lat': 'lat', 'Origin Lon': 'lon'}, inplace=True)
-
-    dest_df = data[['Destination', 'Dest Lat', 'Dest Lon']].drop_duplicates()
-    dest_df['text'] = dest_df['Destination']
-    dest_df['size'] = 8
-    dest_df['color'] = 'orange'
-    dest_df['shape'] = 'circle'
-    dest_df['name'] = dest_df['Destination']
-    dest_df.rename(columns={'Dest Lat': 'lat', 'Dest Lon': 'lon'}, inplace=True)
-    # we'll concat origin_df with dest_df
-    origin_df.drop('Origin', axis=1, inplace=True)
-    dest_df.drop('Destination', axis=1, inplace=True)
-
-    df_dict = {'Plant': origin_df, 'Customer': dest_df}
-    return df_dict
-
-
-def set_locations_map(df_dict):
+def create_location_data(data):
+    """Return the per-location-type attributes needed for the plot.
+
+    The style attributes (size, color, shape) are one scalar per location
+    type, so they are kept as scalars next to the coordinate arrays instead
+    of being broadcast into constant columns of per-type dataframe copies.
+    """
+    # dropna removes the padding rows that pd.concat(axis=1) adds when there
+    # are fewer plants than customers (see prepare_location_dataframe)
+    origin_df = data[['Origin', 'Origin Lat', 'Origin Lon']].drop_duplicates().dropna()
+    dest_df = data[['Destination', 'Dest Lat', 'Dest Lon']].drop_duplicates().dropna()
+    location_dict = {
+        'Plant': dict(text=origin_df['Origin'].to_numpy(),
+                      lat=origin_df['Origin Lat'].to_numpy(),
+                      lon=origin_df['Origin Lon'].to_numpy(),
+                      size=20, color='blue', shape='triangle-up'),
+        'Customer': dict(text=dest_df['Destination'].to_numpy(),
+                         lat=dest_df['Dest Lat'].to_numpy(),
+                         lon=dest_df['Dest Lon'].to_numpy(),
+                         size=8, color='orange', shape='circle')}
+    return location_dict
+
+
+def set_locations_map(location_dict):
     """Create a list of dictionaries that hold location attributes needed for the plot."""
     locations = []
-    for name, df in df_dict.items():
+    for name, attrs in location_dict.items():
         try:
             locations.append(
                 dict(type='scattergeo',
-                     lon=df['lon'],
-                     lat=df['lat'],
-                     text=df['text'],
+                     lon=attrs['lon'],
+                     lat=attrs['lat'],
+                     text=attrs['text'],
                      name=name,
-                     marker=dict(size=df['size'],
-                                 symbol=df['shape'],
-                                 color=df['color'],
+                     marker=dict(size=attrs['size'],
+                                 symbol=attrs['shape'],
+                                 color=attrs['color'],
                                  line=dict(width=3, color='rgba(68, 68, 68, 0)'))))
         except KeyError:
             pass
     return locations
 
 
-def get_lat_lon_range(df_dict):
+def get_lat_lon_range(location_dict):
     """Return the range of lat and lon in the data."""
-    min_lat = +90
-    max_lat = -90
-    min_lon = +180
-    max_lon = -180
-    for df in df_dict.values():
+    lats, lons = [], []
+    for attrs in location_dict.values():
         try:
-            df_lat_min = df['lat'].min()
-            df_lat_max = df['lat'].max()
-            df_lon_min = df['lon'].min()
-            df_lon_max = df['lon'].max()
-            if df_lat_min < min_lat:
-                min_lat = df_lat_min
-            if df_lat_max > max_lat:
-                max_lat = df_lat_max
-            if df_lon_min < min_lon:
-                min_lon = df_lon_min
-            if df_lon_max > max_lon:
-                max_lon = df_lon_max
+            lats.append(attrs['lat'])
+            lons.append(attrs['lon'])
         except KeyError:
             pass
-    return [min_lat, max_lat], [min_lon, max_lon]
+    if not lats:
+        return [+90, -90], [+180, -180]
+    # One concatenated min/max pass per axis instead of running comparisons
+    # per location type. The nan-variants keep missing coordinates from
+    # propagating into the range and forcing the scope to 'world'.
+    all_lat = np.concatenate(lats)
+    all_lon = np.concatenate(lons)
+    return ([np.nanmin(all_lat), np.nanmax(all_lat)],
+            [np.nanmin(all_lon), np.nanmax(all_lon)])
+
+
+# Bounding boxes as (min lat, max lat, min lon, max lon), checked in order.
+# We're interested in USA, North America, South America, and Europe;
+# asia and africa can be added here if needed.
+SCOPE_BOUNDS = [('usa', (24, 55, -127, -50)),
+                ('north america', (15, 85, -170, -50)),
+                ('europe', (30, 80, -20, 70)),
+                ('south america', (-60, 12, -81, -34))]
 
 
 def get_scope(lat_range, lon_range):
@@ -127,29 +130,10 @@ def get_scope(lat_range, lon_range):
     "world" | "usa" | "europe" | "asia" | "africa" | "north america" | "south america".
     (source: https://plot.ly/python/reference/#layout-geo-scope)
 
-    We're interested in USA, North America, South America, and Europe.
+    The first bounding box in SCOPE_BOUNDS that contains the data wins.
     """
-    us_lat_rng = [24, 55]
-    us_lon_rng = [-127, -50]
-    na_lat_rng = [15, 85]
-    na_lon_rng = [-170, -50]
-    eu_lat_rng = [30, 80]
-    eu_lon_rng = [-20, 70]
-    sa_lat_rng = [-60, 12]
-    sa_lon_rng = [-81, -34]
-
-    if (lat_range[0] >= us_lat_rng[0] and lat_range[1] <= us_lat_rng[1]
-            and lon_range[0] >= us_lon_rng[0] and lon_range[1] <= us_lon_rng[1]):
-        scope = 'usa'
-    elif (lat_range[0] >= na_lat_rng[0] and lat_range[1] <= na_lat_rng[1]
-          and lon_range[0] >= na_lon_rng[0] and lon_range[1] <= na_lon_rng[1]):
-        scope = 'north america'
-    elif (lat_range[0] >= eu_lat_rng[0] and lat_range[1] <= eu_lat_rng[1]
-          and lon_range[0] >= eu_lon_rng[0] and lon_range[1] <= eu_lon_rng[1]):
-        scope = 'europe'
-    elif (lat_range[0] >= sa_lat_rng[0] and lat_range[1] <= sa_lat_rng[1]
-          and lon_range[0] >= sa_lon_rng[0] and lon_range[1] <= sa_lon_rng[1]):
-        scope = 'south america'
-    else:  # can add asia and africa
-        scope = 'world'  # default
-    return scope
+    for scope, (lat_min, lat_max, lon_min, lon_max) in SCOPE_BOUNDS:
+        if (lat_min <= lat_range[0] and lat_range[1] <= lat_max
+                and lon_min <= lon_range[0] and lon_range[1] <= lon_max):
+            return scope
+    return 'world'  # default
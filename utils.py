@@ -1,8 +1,20 @@
+import shutil
 from math import radians, cos, sin, sqrt, atan2
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+try:
+    import numba
+except ImportError:  # numba is optional; the NumPy version is used without it
+    numba = None
+
+# Radius of earth by unit name. Another alternative for miles is
+# 6376.4999975644832 km (3962.173405788 mile)
+_RADIUS = {'miles': 3958.756, 'mile': 3958.756, 'm': 3958.756,
+           'kilometers': 6371.00, 'kilometer': 6371.00, 'km': 6371.00}
+
 
 def load_raw_data(input_dir='', selected_sheets=None, get_single_file=True):
     assert (isinstance(selected_sheets, (str, list))
@@ -41,10 +53,11 @@ def read_excel_files(input_files, selected_sheets=None):
 
 
 def read_excel(input_file, file_name='', selected_sheets=None):
-    excel_file = pd.ExcelFile(input_file)
-    sheets = selected_sheets or excel_file.sheet_names
+    # A single read_excel call is enough: sheet_name=None loads all sheets, so
+    # there is no need to parse the workbook once more through pd.ExcelFile
+    # just to list its sheet names.
     try:
-        input_df_dict = pd.read_excel(excel_file, sheets)
+        input_df_dict = pd.read_excel(input_file, sheet_name=selected_sheets)
     except Exception as e:  # xlrd.XLRDError or ValueError
         file_name = file_name or input_file
         print(f'WARNING: {file_name} is missing some sheets! {e}')
@@ -52,6 +65,50 @@ def read_excel(input_file, file_name='', selected_sheets=None):
     return input_df_dict
 
 
+def read_excel_cached(input_file):
+    """Read all sheets of an Excel workbook, caching each sheet as Parquet.
+
+    Workbook parsing is I/O and XML bound and dominates repeated runs on the
+    same data. The first read dumps every sheet into a '<file stem>_cache'
+    directory next to the workbook; later reads load the columnar Parquet
+    copies instead, as long as they are newer than the workbook. Caching is
+    best-effort: without a Parquet engine installed we just read the Excel
+    file every time.
+    """
+    input_file = Path(input_file)
+    cache_dir = input_file.with_name(f'{input_file.stem}_cache')
+    cached_files = sorted(cache_dir.glob('*.parquet')) if cache_dir.is_dir() else []
+    if cached_files and all(f.stat().st_mtime >= input_file.stat().st_mtime for f in cached_files):
+        return {f.stem: pd.read_parquet(f) for f in cached_files}
+    input_df_dict = read_excel(input_file)
+    write_parquet_cache(input_df_dict, cache_dir)
+    return input_df_dict
+
+
+def write_parquet_cache(input_df_dict, cache_dir):
+    """(Re)build a Parquet cache directory atomically.
+
+    The sheets are written to a temporary sibling directory that replaces
+    `cache_dir` only once every sheet is on disk. An interrupted or failed
+    write therefore cannot leave a partial cache behind for later runs to
+    read as a complete workbook, and replacing the whole directory also
+    clears stale files of sheets that were renamed or removed. Caching is
+    best-effort: on any failure the cache is simply dropped and the next
+    run reads the Excel file again.
+    """
+    tmp_dir = cache_dir.with_name(f'{cache_dir.name}.tmp')
+    try:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        for sheet_name, df in input_df_dict.items():
+            df.to_parquet(tmp_dir / f'{sheet_name}.parquet')
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        tmp_dir.rename(cache_dir)
+    except Exception as e:  # no pyarrow/fastparquet, unsupported dtypes, ...
+        print(f'WARNING: could not cache {cache_dir.name}! {e}')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
 def calculate_distance_haversine(lat1, lon1, lat2, lon2, road_factor=1, units='miles'):
     """Compute great circle distance between two points
 
@@ -65,15 +122,12 @@ def calculate_distance_haversine(lat1, lon1, lat2, lon2, road_factor=1, units='m
     Returns
         float: distance between points
     """
-    # set radius of earth
-    u = units.lower()
-    r = 3958.756  # default is in miles
-    if u in {'miles', 'mile', 'm'}:
-        r = 3958.756  # another alternative 6376.4999975644832 km (3962.173405788 mile)
-    elif u in {'kilometers', 'kilometer', 'km'}:
-        r = 6371.00
-    else:
+    # set radius of earth with one dict lookup; cheaper than a chain of string
+    # comparisons when called in a tight loop
+    r = _RADIUS.get(units.lower())
+    if r is None:
         print(f"'km' or 'miles' are options. {units} is passed. 'miles' is used by default.")
+        r = _RADIUS['miles']
 
     # convert decimal degrees to radians
     lat1, lon1, lat2, lon2 = [radians(x) for x in [lat1, lon1, lat2, lon2]]
@@ -86,6 +140,67 @@ def calculate_distance_haversine(lat1, lon1, lat2, lon2, road_factor=1, units='m
     return r * c * road_factor
 
 
+def calculate_distance_haversine_vector(lat1, lon1, lat2, lon2, road_factor=1, units='miles'):
+    """Compute great circle distances between arrays of points.
+
+    This is the vectorized version of `calculate_distance_haversine`. The inputs
+    are NumPy arrays and broadcast against each other, so passing an (N, 1) array
+    of origins and a (1, M) array of destinations returns the full (N, M)
+    distance matrix in one shot instead of N*M Python-level calls.
+
+    Args:
+        lat1 (np.ndarray): lat coordinates of the first locations in decimal degrees
+        lon1 (np.ndarray): lon coordinates of the first locations in decimal degrees
+        lat2 (np.ndarray): lat coordinates of the second locations in decimal degrees
+        lon2 (np.ndarray): lon coordinates of the second locations in decimal degrees
+        road_factor (float): multiply distance to account for road (default = 1)
+        units (str): units for distance. It must be either miles or kilometers. Defaults to 'miles'
+    Returns
+        np.ndarray: distances between points, in the broadcast shape of the inputs
+    """
+    # set radius of earth
+    r = _RADIUS.get(units.lower())
+    if r is None:
+        print(f"'km' or 'miles' are options. {units} is passed. 'miles' is used by default.")
+        r = _RADIUS['miles']
+
+    # convert decimal degrees to radians
+    lat1, lon1, lat2, lon2 = [np.radians(x) for x in [lat1, lon1, lat2, lon2]]
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return r * c * road_factor
+
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def calculate_distance_haversine_numba(lat1, lon1, lat2, lon2, road_factor=1.0, r=3958.756):
+        """Compute the great circle distance matrix between two sets of points.
+
+        JIT-compiled version of `calculate_distance_haversine_vector`. The nested
+        loop computes one output element at a time, so all the intermediate
+        values stay in registers instead of becoming N x M temporary arrays, and
+        the outer loop runs in parallel across cores.
+
+        The inputs are 1D arrays of decimal degrees; the result is the (N, M)
+        distance matrix with the radius of earth `r` in miles by default.
+        """
+        out = np.empty((lat1.shape[0], lat2.shape[0]))
+        for i in numba.prange(lat1.shape[0]):
+            rlat1 = radians(lat1[i])
+            rlon1 = radians(lon1[i])
+            for j in range(lat2.shape[0]):
+                rlat2 = radians(lat2[j])
+                dlon = radians(lon2[j]) - rlon1
+                dlat = rlat2 - rlat1
+                a = sin(dlat / 2) ** 2 + cos(rlat1) * cos(rlat2) * sin(dlon / 2) ** 2
+                out[i, j] = r * 2 * atan2(sqrt(a), sqrt(1 - a)) * road_factor
+        return out
+else:
+    calculate_distance_haversine_numba = None
+
+
 def prepare_location_dataframe(plants, customers):
     """Return a dataframe with the proper attributes needed for the plot."""
     origin_df = plants[['Plant Name', 'Latitude', 'Longitude']].copy()